@@ -5,8 +5,13 @@ from __future__ import annotations
 import argparse
 import json
 from pathlib import Path
-from typing import Dict, Optional, Tuple
-import xml.etree.ElementTree as ET
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import orjson
+from lxml import etree as ET
+
+# Prompt echo markers, in priority order, preceding the translated text.
+TRANSLATION_MARKERS = ("Text:\r\n", "Text:\n", "文本:\n", "Text: ")
 
 
 def parse_arguments() -> argparse.Namespace:
@@ -56,32 +61,32 @@ def parse_arguments() -> argparse.Namespace:
 
 
 def extract_translated_text(content: str) -> str:
-    markers = ["Text:\r\n", "Text:\n", "文本:\n", "Text: "]
-    for marker in markers:
-        if marker in content:
-            return content.split(marker, 1)[1]
+    # partition finds and splits in a single scan per marker.
+    for marker in TRANSLATION_MARKERS:
+        _, found, translated = content.partition(marker)
+        if found:
+            return translated
     return content
 
 
-def load_translations(jsonl_path: Path) -> Dict[str, str]:
-    translations: Dict[str, str] = {}
+def iter_translations(jsonl_path: Path) -> Iterator[Tuple[int, str, str]]:
+    """Yield ``(line_no, custom_id, translation)`` for each response line."""
+    parsed = 0
 
-    with jsonl_path.open("r", encoding="utf-8") as reader:
+    with jsonl_path.open("rb") as reader:
         for line_no, raw_line in enumerate(reader, start=1):
             line = raw_line.strip()
             if not line:
                 continue
 
             try:
-                payload = json.loads(line)
-            except json.JSONDecodeError as exc:
+                payload = orjson.loads(line)
+            except orjson.JSONDecodeError as exc:
                 raise ValueError(f"Invalid JSON on line {line_no}: {exc}") from exc
 
             custom_id = payload.get("custom_id")
             if not custom_id:
                 raise ValueError(f"Missing custom_id on line {line_no}")
-            if custom_id in translations:
-                raise ValueError(f"Duplicate custom_id '{custom_id}' on line {line_no}")
 
             error = payload.get("error")
             if error:
@@ -103,15 +108,95 @@ def load_translations(jsonl_path: Path) -> Dict[str, str]:
             if content is None:
                 raise ValueError(f"Empty translation content for custom_id '{custom_id}'")
 
-            translations[custom_id] = extract_translated_text(content)
+            parsed += 1
+            yield line_no, custom_id, extract_translated_text(content)
 
-    if not translations:
+    if not parsed:
         raise ValueError(f"No translations parsed from {jsonl_path}")
 
-    return translations
+
+def request_index(custom_id: str) -> Optional[int]:
+    prefix, _, suffix = custom_id.rpartition("-")
+    if prefix != "request" or not suffix.isdigit() or str(int(suffix)) != suffix:
+        return None
+    return int(suffix)
+
+
+def sort_translations(jsonl_path: Path) -> List[Tuple[int, str, str]]:
+    """Load every response and order it by request index (non-request ids first)."""
+
+    def sort_key(entry: Tuple[int, str, str]) -> int:
+        index = request_index(entry[1])
+        return -1 if index is None else index
+
+    return sorted(iter_translations(jsonl_path), key=sort_key)
+
+
+class ResponsesOutOfOrder(ValueError):
+    """Raised when response custom_ids are not in ascending request order."""
 
 
-def should_update(translation_elem: Optional[ET.Element], include_finished: bool) -> bool:
+class TranslationStream:
+    """Serve translations by increasing request index from ordered responses.
+
+    Only the next unmatched response is buffered, so memory does not grow
+    with the number of translations.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[int, str, str]]) -> None:
+        self._entries = iter(entries)
+        self._pending: Optional[Tuple[int, str, str]] = None
+        self._last_index: Optional[int] = None
+        # Ids outside the request-N scheme cannot be checked by ordering.
+        self._other_ids: Set[str] = set()
+        self.count = 0
+        self.unused_ids: List[str] = []
+
+    def _next(self) -> Optional[Tuple[int, str, str]]:
+        """Return the next ``(index, custom_id, translation)`` response."""
+        for line_no, custom_id, translation_text in self._entries:
+            self.count += 1
+            index = request_index(custom_id)
+            if index is None:
+                if custom_id in self._other_ids:
+                    raise ValueError(f"Duplicate custom_id '{custom_id}' on line {line_no}")
+                self._other_ids.add(custom_id)
+                self.unused_ids.append(custom_id)
+                continue
+            if self._last_index is not None and index <= self._last_index:
+                if index == self._last_index:
+                    raise ValueError(f"Duplicate custom_id '{custom_id}' on line {line_no}")
+                raise ResponsesOutOfOrder(
+                    f"custom_id '{custom_id}' on line {line_no} is out of order"
+                )
+            self._last_index = index
+            return index, custom_id, translation_text
+        return None
+
+    def take(self, index: int) -> Optional[str]:
+        """Return the translation for ``index``, skipping lower indices."""
+        while True:
+            entry = self._pending or self._next()
+            self._pending = None
+            if entry is None:
+                return None
+            entry_index, custom_id, translation_text = entry
+            if entry_index == index:
+                return translation_text
+            if entry_index > index:
+                self._pending = entry
+                return None
+            self.unused_ids.append(custom_id)
+
+    def drain(self) -> List[str]:
+        """Consume the remaining responses and return every unused custom_id."""
+        while (entry := self._pending or self._next()) is not None:
+            self._pending = None
+            self.unused_ids.append(entry[1])
+        return self.unused_ids
+
+
+def should_update(translation_elem: Optional[ET._Element], include_finished: bool) -> bool:
     if translation_elem is None:
         return True
 
@@ -124,7 +209,7 @@ def should_update(translation_elem: Optional[ET.Element], include_finished: bool
     return not text.strip() or is_unfinished
 
 
-def ensure_translation_elem(message_elem: ET.Element) -> ET.Element:
+def ensure_translation_elem(message_elem: ET._Element) -> ET._Element:
     translation_elem = message_elem.find("translation")
     if translation_elem is None:
         translation_elem = ET.SubElement(message_elem, "translation")
@@ -134,18 +219,20 @@ def ensure_translation_elem(message_elem: ET.Element) -> ET.Element:
 
 def apply_translations(
     ts_path: Path,
-    translations: Dict[str, str],
+    translations: Iterable[Tuple[int, str, str]],
     *,
     start_index: int,
     deduplicate: bool,
     include_finished: bool,
     strict: bool,
-    ) -> Tuple[int, ET.ElementTree]:
-    tree = ET.parse(ts_path)
+    ) -> Tuple[int, ET._ElementTree]:
+    tree = ET.parse(str(ts_path))
     root = tree.getroot()
 
     seen_sources: Dict[str, str] = {}
-    used_custom_ids: set[str] = set()
+    # Messages consume request indices in increasing order, so the responses
+    # are read in lockstep with the tree walk instead of loaded up front.
+    stream = TranslationStream(translations)
 
     current_index = start_index
     updates = 0
@@ -170,13 +257,15 @@ def apply_translations(
                 updates += 1
                 continue
 
-            custom_id = f"request-{current_index}"
-            translation_text = translations.get(custom_id)
+            translation_text = stream.take(current_index)
             if translation_text is None:
                 if strict:
+                    # Read the rest first so invalid or unordered input is
+                    # reported instead of a spurious missing id.
+                    stream.drain()
                     raise KeyError(
-                        f"Missing translation for custom_id '{custom_id}'. "
-                        f"Available keys: {len(translations)}."
+                        f"Missing translation for custom_id 'request-{current_index}'. "
+                        f"Available keys: {stream.count}."
                     )
                 current_index += 1
                 continue
@@ -185,20 +274,16 @@ def apply_translations(
             translation_elem.attrib.pop("type", None)
 
             seen_sources[source_text] = translation_text
-            used_custom_ids.add(custom_id)
             updates += 1
             current_index += 1
 
-    unused_ids = set(translations.keys()) - used_custom_ids
+    unused_ids = stream.drain()
     if unused_ids and strict:
         raise ValueError(
             "Unused translations detected: "
             + ", ".join(sorted(unused_ids))
         )
 
-    if hasattr(ET, "indent"):
-        ET.indent(tree, space="  ")  # type: ignore[attr-defined]
-
     return updates, tree
 
 
@@ -210,18 +295,29 @@ def main() -> None:
     if not args.responses.is_file():
         raise FileNotFoundError(f"Responses JSONL file not found: {args.responses}")
 
-    translations = load_translations(args.responses)
-    updates, tree = apply_translations(
-        args.input,
-        translations,
+    apply_options = dict(
         start_index=args.start_index,
         deduplicate=args.deduplicate,
         include_finished=args.include_finished,
         strict=args.strict,
     )
+    try:
+        updates, tree = apply_translations(
+            args.input, iter_translations(args.responses), **apply_options
+        )
+    except ResponsesOutOfOrder:
+        # Batch APIs may return results in any order; sort them in memory.
+        updates, tree = apply_translations(
+            args.input, sort_translations(args.responses), **apply_options
+        )
 
     args.output.parent.mkdir(parents=True, exist_ok=True)
-    tree.write(args.output, encoding="utf-8", xml_declaration=True)
+    tree.write(
+        str(args.output),
+        encoding="utf-8",
+        xml_declaration=True,
+        pretty_print=True,
+    )
 
     print(f"Applied {updates} translations to {args.output}.")
 
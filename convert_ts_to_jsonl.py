@@ -3,12 +3,14 @@
 from __future__ import annotations
 
 import argparse
-import json
+import hashlib
 from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
 from typing import Iterable, List, Optional, Sequence, Set
-import xml.etree.ElementTree as ET
+
+import orjson
+from lxml import etree as ET
 
 DEFAULT_SYSTEM_PROMPT = (
     "你是思科 Packet Tracer 及网络工程领域的本地化专家，请将输入文本精准翻译为简体中文。"
@@ -16,6 +18,9 @@ DEFAULT_SYSTEM_PROMPT = (
     "务必沿用业界常用的网络工程术语（如 VLAN、ACL、OSPF、Interface 等），CLI 命令、设备型号和寄存器名称不要翻译或改写，注意大小写和标点符号保持原样。"
 )
 
+# Number of JSONL lines buffered before each write to the output file.
+WRITE_BATCH_SIZE = 1024
+
 
 class ContextMode(str, Enum):
     FULL = "full"
@@ -102,10 +107,8 @@ def parse_arguments() -> argparse.Namespace:
 
 
 def iter_messages(ts_path: Path, *, include_finished: bool = False) -> Iterable[TsMessage]:
-    tree = ET.parse(ts_path)
-    root = tree.getroot()
-
-    for context_elem in root.findall("context"):
+    # Stream <context> elements so only one context worth of nodes stays alive.
+    for _, context_elem in ET.iterparse(str(ts_path), events=("end",), tag="context"):
         context_name = context_elem.findtext("name") or ""
         context_name = context_name.strip()
 
@@ -150,6 +153,10 @@ def iter_messages(ts_path: Path, *, include_finished: bool = False) -> Iterable[
                 locations=locations,
             )
 
+        context_elem.clear()
+        while context_elem.getprevious() is not None:
+            del context_elem.getparent()[0]
+
 
 def format_locations(locations: Sequence[str], limit: int) -> Optional[str]:
     if limit == 0 or not locations:
@@ -206,22 +213,29 @@ def main() -> None:
     output_path = args.output
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
-    seen_sources: Set[str] = set()
+    # Fixed-size digests keep the dedup set small regardless of source length.
+    seen_hashes: Set[bytes] = set()
     exported = 0
     custom_index = args.start_index
 
     context_mode = ContextMode(args.context_mode)
     max_locations = args.max_locations if args.max_locations is not None else -1
 
-    with output_path.open("w", encoding="utf-8", newline="\n") as writer:
+    # The system message is identical for every request, build it only once.
+    system_message = {"role": "system", "content": args.system_prompt}
+    batch: List[bytes] = []
+
+    with output_path.open("wb") as writer:
         for message in iter_messages(
             args.input, include_finished=args.include_finished
         ):
-            source_key = message.source
             if args.deduplicate:
-                if source_key in seen_sources:
+                source_hash = hashlib.blake2b(
+                    message.source.encode("utf-8"), digest_size=16
+                ).digest()
+                if source_hash in seen_hashes:
                     continue
-                seen_sources.add(source_key)
+                seen_hashes.add(source_hash)
 
             user_prompt = build_user_prompt(
                 message,
@@ -235,14 +249,16 @@ def main() -> None:
                 "body": {
                     "model": args.model,
                     "messages": [
-                        {"role": "system", "content": args.system_prompt},
+                        system_message,
                         {"role": "user", "content": user_prompt},
                     ],
                 },
             }
 
-            writer.write(json.dumps(payload, ensure_ascii=False))
-            writer.write("\n")
+            batch.append(orjson.dumps(payload))
+            if len(batch) >= WRITE_BATCH_SIZE:
+                writer.write(b"\n".join(batch) + b"\n")
+                batch.clear()
 
             exported += 1
             custom_index += 1
@@ -250,6 +266,9 @@ def main() -> None:
             if args.max_entries is not None and exported >= args.max_entries:
                 break
 
+        if batch:
+            writer.write(b"\n".join(batch) + b"\n")
+
     print(
         f"Exported {exported} translation requests to {output_path} "
         f"(starting index {args.start_index})."
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Report translation coverage of Qt Linguist TS files."""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Tuple
+
+from lxml import etree as ET
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Count total and translated messages in Qt Linguist TS files."
+    )
+    parser.add_argument(
+        "inputs",
+        type=Path,
+        nargs="+",
+        help="Path(s) to the .ts files to inspect.",
+    )
+    return parser.parse_args()
+
+
+def get_language_coverage(xml_path: Path) -> Tuple[int, int]:
+    language_sum = 0
+    language_cover = 0
+
+    # Stream <message> elements and drop them once counted to keep memory flat.
+    for _, elem in ET.iterparse(str(xml_path), events=("end",), tag="message"):
+        source_text = elem.findtext("source")
+        if source_text:
+            language_sum += 1
+            translation_elem = elem.find("translation")
+            if (
+                translation_elem is not None
+                and translation_elem.text
+                and translation_elem.text.strip()
+                and translation_elem.get("type") != "unfinished"
+            ):
+                language_cover += 1
+
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+    return language_sum, language_cover
+
+
+def main() -> None:
+    args = parse_arguments()
+
+    for ts_path in args.inputs:
+        if not ts_path.is_file():
+            raise FileNotFoundError(f"Input TS file not found: {ts_path}")
+
+        language_sum, language_cover = get_language_coverage(ts_path)
+        percentage = (language_cover / language_sum * 100) if language_sum else 100.0
+        print(f"{ts_path}: {language_cover}/{language_sum} ({percentage:.2f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,53 +1,108 @@
 # https://huggingface.co/tencent/Hunyuan-MT-7B
 
-from transformers import AutoModelForCausalLM, AutoTokenizer
+from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig
 import torch
 import sys
 sys.path.append("./model")
 from xmlPraser import TSParser
 
 model_name_or_path = "tencent/Hunyuan-MT-7B"
+# 推理后端："transformers" 或 "vllm"（需额外 pip install vllm，连续批处理吞吐更高）
+backend = "transformers"
+# 每次送入模型的待翻译条目数；vLLM 自行调度批次，给它更多条目以填满 KV cache
+batch_size = 256 if backend == "vllm" else 8
+# transformers 后端：权重量化为 int8，减少解码时每个 token 需要读取的权重字节数
+load_in_8bit = True
+# transformers 后端：静态 KV cache + torch.compile，将解码步骤捕获为 CUDA Graph；
+# bitsandbytes 的 int8 算子会在每个线性层打断计算图，因此仅在 load_in_8bit = False 时生效
+compile_model = False
 
 tokenizer = AutoTokenizer.from_pretrained(model_name_or_path)
-model = AutoModelForCausalLM.from_pretrained(model_name_or_path,
-                                             device_map="auto",
-                                             dtype=torch.bfloat16,
-                                             low_cpu_mem_usage=True,
-                                             )  # You may want to use bfloat16 and/or move to GPU here
+# 批量生成需要左侧填充，使每条输入的末尾对齐到生成起点
+tokenizer.padding_side = "left"
+if tokenizer.pad_token is None:
+    tokenizer.pad_token = tokenizer.eos_token
+eos_token_id = tokenizer.convert_tokens_to_ids('<|eos|>')
+
+if backend == "vllm":
+    from vllm import LLM
+
+    llm = LLM(model=model_name_or_path, dtype="bfloat16", quantization="fp8")
+    # 沿用模型 generation_config 中推荐的采样参数（top_k、top_p、temperature、repetition_penalty），
+    # 与 transformers 后端保持一致
+    sampling_params = llm.get_default_sampling_params()
+    sampling_params.max_tokens = 2048
+    sampling_params.stop_token_ids = [eos_token_id]
+else:
+    # 显存或带宽更紧张时可改用 BitsAndBytesConfig(load_in_4bit=True, bnb_4bit_compute_dtype=torch.bfloat16)
+    quantization_config = BitsAndBytesConfig(load_in_8bit=True) if load_in_8bit else None
+    model = AutoModelForCausalLM.from_pretrained(model_name_or_path,
+                                                 device_map="auto",
+                                                 dtype=torch.bfloat16,
+                                                 low_cpu_mem_usage=True,
+                                                 quantization_config=quantization_config,
+                                                 )  # You may want to use bfloat16 and/or move to GPU here
+    compile_model = compile_model and not load_in_8bit
+    if compile_model:
+        model.generation_config.cache_implementation = "static"
+        model.forward = torch.compile(model.forward, mode="reduce-overhead")
 
-parser = TSParser('zh_cn_Hunyuan-MT-7B.ts')
-for context_name, source_text, translation_elem in parser.get_unfinished_translations():
-    # 获取并打印当前进度
-    processed, total, percentage = parser.get_progress()
-    print(f"翻译进度: {processed}/{total} ({percentage:.2f}%)")
 
-    messages = [
-        {"role": "user", "content": f"翻译成简体中文\n\n{source_text}"},
+def decode_translation(generated_ids):
+    # 只解码第一个 <|eos|> 之前新生成的token，得到真正的翻译文本
+    eos_positions = (generated_ids == eos_token_id).nonzero()
+    if len(eos_positions) > 0:
+        generated_ids = generated_ids[:eos_positions[0, 0]]
+    return tokenizer.decode(generated_ids, skip_special_tokens=True)
+
+
+def translate_batch(source_texts):
+    conversations = [
+        [{"role": "user", "content": f"翻译成简体中文\n\n{source_text}"}]
+        for source_text in source_texts
     ]
 
-    tokenized_chat = tokenizer.apply_chat_template(
-        messages,
+    if backend == "vllm":
+        # 直接传入token id，避免vLLM重复添加起始符
+        prompt_token_ids = tokenizer.apply_chat_template(
+            conversations,
+            tokenize=True,
+            add_generation_prompt=False,
+            return_dict=False,
+        )
+        outputs = llm.generate(
+            [{"prompt_token_ids": token_ids} for token_ids in prompt_token_ids],
+            sampling_params,
+        )
+        return [output.outputs[0].text for output in outputs]
+
+    if compile_model:
+        # 编译后的图按形状缓存：用重复的最后一条补齐到固定 batch_size（其输出丢弃），
+        # 并将输入长度按 64 对齐，使各次调用尽量复用同一形状
+        conversations += conversations[-1:] * (batch_size - len(conversations))
+
+    inputs = tokenizer.apply_chat_template(
+        conversations,
         tokenize=True,
         add_generation_prompt=False,
+        padding=True,
+        tokenizer_kwargs={"pad_to_multiple_of": 64} if compile_model else {},
+        return_dict=True,
         return_tensors="pt"
-    )
-
-    outputs = model.generate(tokenized_chat.to(model.device), max_new_tokens=2048)
-    output_text = tokenizer.decode(outputs[0])
-    
-    # 处理模型输出，提取真正的翻译文本
-    if '<|extra_0|>' in output_text:
-        # 提取 <|extra_0|> 和 <|eos|> 之间的内容
-        start_index = output_text.find('<|extra_0|>') + len('<|extra_0|>')
-        end_index = output_text.find('<|eos|>')
-        if end_index == -1:  # 如果没有找到 <|eos|>
-            translated_text = output_text[start_index:]
-        else:
-            translated_text = output_text[start_index:end_index]
-    else:
-        # 如果没有特殊标记，使用整个输出（去掉开始和结束标记）
-        translated_text = output_text.replace('<|startoftext|>', '').replace('<|eos|>', '')
+    ).to(model.device)
+
+    outputs = model.generate(**inputs,
+                             max_new_tokens=2048,
+                             use_cache=True,
+                             eos_token_id=eos_token_id,
+                             pad_token_id=tokenizer.pad_token_id,
+                             )
+    # 丢弃（左侧填充后等长的）输入部分，只保留生成部分
+    generated = outputs[:, inputs["input_ids"].shape[1]:]
+    return [decode_translation(generated_ids) for generated_ids in generated[:len(source_texts)]]
+
 
+def write_translation(context_name, source_text, translation_elem, translated_text):
     parser.update_translation(context_name, source_text, translation_elem, translated_text)
 
     print("=" * 50)
@@ -55,4 +110,36 @@ for context_name, source_text, translation_elem in parser.get_unfinished_transla
     print(f"Source: {source_text}")
     print(f"Translation: {translated_text}")
 
-parser.save('zh_cn_Hunyuan-MT-7B.ts')
\ No newline at end of file
+
+def translate_waiting():
+    # 将等待中的源文本作为一个批次送入模型，再把译文分发给所有等待该源文本的条目
+    # 获取并打印当前进度
+    processed, total, percentage = parser.get_progress()
+    print(f"翻译进度: {processed}/{total} ({percentage:.2f}%)")
+
+    source_texts = list(waiting)
+    translation_cache.update(zip(source_texts, translate_batch(source_texts)))
+    for source_text in source_texts:
+        for context_name, translation_elem in waiting.pop(source_text):
+            write_translation(context_name, source_text, translation_elem, translation_cache[source_text])
+
+
+parser = TSParser('zh_cn_Hunyuan-MT-7B.ts')
+# 源文本 -> 译文；不同上下文中重复出现的源文本（如 OK、Cancel）只需翻译一次
+translation_cache = {}
+# 源文本 -> 等待其译文的 (context_name, translation_elem) 列表；凑满 batch_size 个不同源文本才调用模型
+waiting = {}
+for context_name, source_text, translation_elem in parser.get_unfinished_translations():
+    if source_text in translation_cache:
+        # 缓存命中的条目立即写入，不占用批次名额
+        write_translation(context_name, source_text, translation_elem, translation_cache[source_text])
+        continue
+
+    waiting.setdefault(source_text, []).append((context_name, translation_elem))
+    if len(waiting) >= batch_size:
+        translate_waiting()
+
+if waiting:
+    translate_waiting()
+
+parser.save('zh_cn_Hunyuan-MT-7B.ts')
@@ -1,6 +1,9 @@
 from lxml import etree
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import os
 import json
+import threading
 
 
 class TSParser:
@@ -8,6 +11,9 @@ class TSParser:
     思科Packet Tracer GUI翻译文件(.ts)解析器
     支持流式更新和中断恢复功能
     """
+
+    # 预编译的XPath：由libxml2在C层直接筛选出source有文本的message元素
+    _MESSAGES_XPATH = etree.XPath('//context/message[source[1]/text()]')
     
     def __init__(self, ts_file_path, checkpoint_file=None, backup_interval=10):
         """
@@ -22,13 +28,34 @@ class TSParser:
         self.tree = etree.parse(ts_file_path)
         self.root = self.tree.getroot()
         self.checkpoint_file = checkpoint_file or ts_file_path + '.checkpoint'
+        # 追加写入的检查点日志，每行一个JSON编码的已处理条目键
+        self.checkpoint_log_file = self.checkpoint_file + '.log'
+        self._checkpoint_fh = None
+        # 后台线程定期备份XML文件，使序列化与模型推理并行；锁保护树的读写
+        self._save_executor = ThreadPoolExecutor(max_workers=1)
+        self._save_future = None
+        self._tree_lock = threading.Lock()
         self.backup_interval = backup_interval
         self.processed_count = 0
+        # 已处理条目键的blake2b摘要，定长16字节，比完整的 "context:source" 字符串更省内存
         self.processed_items = set()
         
         # 初始化进度统计并加载检查点
         self._initialize()
 
+    @staticmethod
+    def _item_hash(item_key):
+        """计算条目键的定长摘要，用于processed_items集合"""
+        return hashlib.blake2b(item_key.encode('utf-8'), digest_size=16).digest()
+
+    @staticmethod
+    def _is_unfinished(translation_elem):
+        """判断翻译元素是否未完成（元素缺失、内容为空白或type为unfinished）"""
+        return (translation_elem is None or
+                not (text := translation_elem.text) or
+                not text.strip() or
+                translation_elem.get('type') == 'unfinished')
+
     def _initialize(self):
         """初始化未完成项目计数并加载检查点文件"""
         # 如果存在检查点文件，则加载已处理的项目
@@ -36,34 +63,43 @@ class TSParser:
             try:
                 with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
                     data = json.load(f)
-                    self.processed_items = set(data.get('processed_items', []))
+                    self.processed_items = {self._item_hash(key) for key in data.get('processed_items', [])}
             except Exception:
                 self.processed_items = set()
-        
-        # 计算总条目数（所有有source的条目）
+
+        # 逐行读取检查点日志，忽略中断时可能写坏的行
+        if os.path.exists(self.checkpoint_log_file):
+            with open(self.checkpoint_log_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self.processed_items.add(self._item_hash(json.loads(line)))
+                    except ValueError:
+                        continue
+        
+        # 单次遍历XML树：缓存所有有source的条目，同时统计总数和已完成数，
+        # 并将已完成的条目同步到已处理项目中
+        self._messages = []
         self.total_items = 0
-        for context in self.root.findall('.//context'):
-            for message in context.findall('.//message'):
-                source_elem = message.find('source')
-                # 只统计有source的条目
-                if source_elem is not None and source_elem.text:
-                    self.total_items += 1
-        
-        # 与XML文件同步，将已完成的条目添加到已处理项目中
-        for context in self.root.findall('.//context'):
-            context_name = context.find('name').text if context.find('name') is not None else ''
-            for message in context.findall('.//message'):
-                source_elem = message.find('source')
-                translation_elem = message.find('translation')
-                
-                # 检查已完成的翻译条目
-                if (source_elem is not None and source_elem.text and 
-                    translation_elem is not None and
-                    translation_elem.text is not None and 
-                    translation_elem.text.strip() != '' and
-                    translation_elem.get('type') != 'unfinished'):
-                    item_key = f"{context_name}:{source_elem.text}"
-                    self.processed_items.add(item_key)
+        self.finished_items = 0
+        current_context = None
+        context_name = ''
+        for message in self._MESSAGES_XPATH(self.root):
+            # message按文档顺序返回，只在进入新的context时查找其名称
+            context = message.getparent()
+            if context is not current_context:
+                current_context = context
+                context_name = context.findtext('name', '')
+
+            source_text = message.find('source').text
+            translation_elem = message.find('translation')
+            self._messages.append((context_name, source_text, translation_elem))
+            self.total_items += 1
+
+            # 检查已完成的翻译条目
+            if not self._is_unfinished(translation_elem):
+                self.finished_items += 1
+                item_key = f"{context_name}:{source_text}"
+                self.processed_items.add(self._item_hash(item_key))
 
     def get_unfinished_translations(self):
         """
@@ -75,24 +111,14 @@ class TSParser:
                 - source_text (str): 源文本
                 - translation_element (etree.Element): 翻译元素
         """
-        for context in self.root.findall('.//context'):
-            context_name = context.find('name').text if context.find('name') is not None else ''
-            for message in context.findall('.//message'):
-                source_elem = message.find('source')
-                translation_elem = message.find('translation')
+        for context_name, source_text, translation_elem in self._messages:
+            # 检查是否需要翻译（translation元素没有内容或者type为unfinished）
+            if translation_elem is not None and self._is_unfinished(translation_elem):
+                item_key = f"{context_name}:{source_text}"
                 
-                # 检查是否需要翻译（translation元素没有内容或者type为unfinished）
-                if translation_elem is not None:
-                    is_unfinished = (translation_elem.text is None or 
-                                   translation_elem.text.strip() == '' or
-                                   translation_elem.get('type') == 'unfinished')
-                    
-                    if is_unfinished and source_elem is not None and source_elem.text:
-                        item_key = f"{context_name}:{source_elem.text}"
-                        
-                        # 如果该项目尚未处理，则返回它
-                        if item_key not in self.processed_items:
-                            yield (context_name, source_elem.text, translation_elem)
+                # 如果该项目尚未处理，则返回它
+                if self._item_hash(item_key) not in self.processed_items:
+                    yield (context_name, source_text, translation_elem)
 
     def get_translation_stats(self):
         """
@@ -104,27 +130,9 @@ class TSParser:
                 - finished_count (int): 已完成条目数
                 - unfinished_count (int): 未完成条目数
         """
-        total_count = 0
-        finished_count = 0
-        
-        for context in self.root.findall('.//context'):
-            for message in context.findall('.//message'):
-                source_elem = message.find('source')
-                translation_elem = message.find('translation')
-                
-                # 只统计有source的条目
-                if source_elem is not None and source_elem.text:
-                    total_count += 1
-                    
-                    # 检查是否已完成翻译
-                    if translation_elem is not None:
-                        is_finished = (translation_elem.text is not None and 
-                                     translation_elem.text.strip() != '' and
-                                     translation_elem.get('type') != 'unfinished')
-                        
-                        if is_finished:
-                            finished_count += 1
-        
+        # 统计数据在初始化时计算，并在update_translation中增量维护
+        total_count = self.total_items
+        finished_count = self.finished_items
         unfinished_count = total_count - finished_count
         return (total_count, finished_count, unfinished_count)
 
@@ -161,33 +169,53 @@ class TSParser:
             translation_element (etree.Element): 翻译元素
             translated_text (str): 翻译后的文本
         """
-        translation_element.text = translated_text
-        # 移除unfinished属性，表示已完成翻译
-        if 'type' in translation_element.attrib:
-            del translation_element.attrib['type']
+        was_finished = not self._is_unfinished(translation_element)
+
+        with self._tree_lock:
+            translation_element.text = translated_text
+            # 移除unfinished属性，表示已完成翻译
+            if 'type' in translation_element.attrib:
+                del translation_element.attrib['type']
+
+        # 增量维护已完成条目数
+        is_finished = not self._is_unfinished(translation_element)
+        self.finished_items += int(is_finished) - int(was_finished)
         
         # 记录已处理的项目
         item_key = f"{context_name}:{source_text}"
-        self.processed_items.add(item_key)
+        self.processed_items.add(self._item_hash(item_key))
         self.processed_count += 1
         
-        # 保存检查点
+        # 保存检查点：只追加本次处理的条目（记录原始键以便恢复），避免每次重写整个已处理集合
         try:
-            # 准备保存的数据
-            data = {
-                'processed_items': list(self.processed_items)
-            }
-            with open(self.checkpoint_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            if self._checkpoint_fh is None:
+                self._checkpoint_fh = open(self.checkpoint_log_file, 'a', encoding='utf-8', buffering=1)
+                # 上次运行若在写入中途中断，日志末尾会残留不完整的行；先补换行，避免与新记录拼接
+                if self._checkpoint_fh.tell() > 0:
+                    with open(self.checkpoint_log_file, 'rb') as f:
+                        f.seek(-1, os.SEEK_END)
+                        if f.read(1) != b'\n':
+                            self._checkpoint_fh.write('\n')
+            self._checkpoint_fh.write(json.dumps(item_key, ensure_ascii=False) + '\n')
         except Exception as e:
             print(f"保存检查点文件失败: {e}")
         
-        # 每隔一定次数保存一次XML文件，防止中断时丢失翻译内容
+        # 每隔一定次数在后台保存一次XML文件，防止中断时丢失翻译内容；
+        # 若已有尚未开始的备份任务在排队，它会写入最新的树，无需重复提交
         if self.processed_count % self.backup_interval == 0:
-            try:
-                self.tree.write(self.ts_file_path, encoding='utf-8', xml_declaration=True, pretty_print=True)
-            except Exception as e:
-                print(f"保存XML文件失败: {e}")
+            pending = self._save_future
+            if pending is None or pending.running() or pending.done():
+                self._save_future = self._save_executor.submit(self._write_snapshot)
+
+    def _write_snapshot(self):
+        """将当前XML树写入临时文件后原子替换原文件"""
+        tmp_path = self.ts_file_path + '.tmp'
+        try:
+            with self._tree_lock:
+                self.tree.write(tmp_path, encoding='utf-8', xml_declaration=True, pretty_print=True)
+            os.replace(tmp_path, self.ts_file_path)
+        except Exception as e:
+            print(f"保存XML文件失败: {e}")
 
     def save(self, output_file_path=None):
         """
@@ -197,11 +225,19 @@ class TSParser:
             output_file_path (str, optional): 输出文件路径，默认为原始文件路径
         """
         file_path = output_file_path if output_file_path else self.ts_file_path
+        # 等待后台备份完成，避免与最终写入冲突
+        if self._save_future is not None:
+            self._save_future.result()
+            self._save_future = None
         self.tree.write(file_path, encoding='utf-8', xml_declaration=True, pretty_print=True)
         
         # 保存成功后删除检查点文件
-        if os.path.exists(self.checkpoint_file):
-            os.remove(self.checkpoint_file)
+        if self._checkpoint_fh is not None:
+            self._checkpoint_fh.close()
+            self._checkpoint_fh = None
+        for path in (self.checkpoint_file, self.checkpoint_log_file):
+            if os.path.exists(path):
+                os.remove(path)
         
         # 清空已处理项目记录
         self.processed_items.clear()